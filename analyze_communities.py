@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import os
-import pandas as pd
-import matplotlib.pyplot as plt
+import re
 import shutil
 from datetime import datetime
 
@@ -14,54 +13,147 @@ Usage:
   python3 analyze_communities.py -f <single_text_file>
   python3 analyze_communities.py -d <directory> -s [save_directory]
   python3 analyze_communities.py -f <file> -s [save_directory]
+  python3 analyze_communities.py -f <file.parquet>
 
 Options:
   -d <directory_name>  Analyze all the text files in the given directory
-  -f <filename>        Analyze a single text file
+  -f <filename>        Analyze a single text file, or a .parquet file saved by dcil.py --format parquet
   -s [directory_name] Save analysis results to specified directory (default: 'Analysis Report')
   -u                   Display this usage information
 """)
 
+# Parsed directory data is cached here so unchanged directories skip re-parsing
+CACHE_FILENAME = '.dcil_cache.parquet'
+CACHE_METADATA_KEY = b'dcil_source_files'
+
+# Above this many points, scatter labels are thinned to one per grid cell
+MAX_POINT_LABELS = 100
+LABEL_GRID_SIZE = 20
+
+# Fixed margins for the scatter/bar figures, used instead of recomputing tight_layout()
+FIGURE_MARGINS = dict(left=0.1, right=0.97, bottom=0.1, top=0.92)
+
+# Matches the report block written by dcil.py's format_report()
+REPORT_PATTERN = re.compile(
+    r'Community Name:[ \t]*(?P<community_name>[^\r\n]*)\r?\n'
+    r'Community Link:[ \t]*(?P<link>[^\r\n]*)\r?\n'
+    r'Total Active Members:[ \t]*(?P<active_members>-?\d+)[ \t]*\r?\n'
+    r'Total Offline Members:[ \t]*(?P<offline_members>-?\d+)[ \t]*\r?\n'
+    r'Total Members:[ \t]*(?P<total_members>-?\d+)'
+)
+
 def load_data_from_file(filepath):
     """Load and parse community data from a text file."""
-    data = {}
     with open(filepath, 'r') as file:
-        lines = file.readlines()
-        for line in lines:
-            if line.startswith("Community Name:"):
-                data['community_name'] = line.split(":")[1].strip()
-            elif line.startswith("Community Link:"):
-                data['link'] = line.split(":")[1].strip()
-            elif line.startswith("Total Active Members:"):
-                data['active_members'] = int(line.split(":")[1].strip())
-            elif line.startswith("Total Offline Members:"):
-                data['offline_members'] = int(line.split(":")[1].strip())
-            elif line.startswith("Total Members:"):
-                data['total_members'] = int(line.split(":")[1].strip())
-    
-    # Calculate additional metrics
-    data['engagement_rate'] = (data['active_members'] / data['total_members'] * 100) if data['total_members'] > 0 else 0
-    data['active_ratio'] = (data['active_members'] / (data['offline_members'] + 1)) # Adding 1 to avoid division by zero
+        text = file.read()
+
+    match = REPORT_PATTERN.search(text)
+    if not match:
+        raise ValueError(f"No community report found in {filepath}")
+
+    data = {
+        'community_name': match['community_name'].strip(),
+        'link': match['link'].strip(),
+        'active_members': int(match['active_members']),
+        'offline_members': int(match['offline_members']),
+        'total_members': int(match['total_members'])
+    }
     return data
 
+def load_data_from_files(filepaths):
+    """Parse the given report files into a DataFrame of the raw community columns."""
+    import numpy as np
+    import pandas as pd
+
+    # Fill one array per column while parsing, then build the DataFrame in one shot
+    n = len(filepaths)
+    names = np.empty(n, dtype=object)
+    links = np.empty(n, dtype=object)
+    active = np.empty(n, dtype=np.int32)
+    offline = np.empty(n, dtype=np.int32)
+    total = np.empty(n, dtype=np.int32)
+    for i, filepath in enumerate(filepaths):
+        community_data = load_data_from_file(filepath)
+        names[i] = community_data['community_name']
+        links[i] = community_data['link']
+        active[i] = community_data['active_members']
+        offline[i] = community_data['offline_members']
+        total[i] = community_data['total_members']
+
+    return pd.DataFrame({
+        'community_name': names,
+        'link': links,
+        'active_members': active,
+        'offline_members': offline,
+        'total_members': total
+    })
+
+def load_data_from_directory(directory):
+    """Load community data from all text files in a directory, using a Parquet cache when fresh."""
+    import json
+
+    cache_path = os.path.join(directory, CACHE_FILENAME)
+    with os.scandir(directory) as it:
+        entries = [entry for entry in it if entry.name.endswith('.txt') and entry.is_file()]
+    filepaths = [entry.path for entry in entries]
+
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return load_data_from_files(filepaths)
+
+    # The cache records the name, size and mtime of every file it was built from, so added,
+    # removed or rewritten files invalidate it even when the directory mtime doesn't change
+    fingerprint = json.dumps(sorted(
+        [entry.name, entry.stat().st_size, entry.stat().st_mtime_ns] for entry in entries
+    )).encode()
+    if os.path.exists(cache_path):
+        try:
+            if (pq.read_schema(cache_path).metadata or {}).get(CACHE_METADATA_KEY) == fingerprint:
+                return pq.read_table(cache_path).to_pandas()
+        except Exception as e:
+            print(f"Ignoring unreadable cache {cache_path}: {e}")
+
+    df = load_data_from_files(filepaths)
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), CACHE_METADATA_KEY: fingerprint})
+        pq.write_table(table, cache_path, compression='zstd')
+    except Exception as e:
+        print(f"Could not write cache {cache_path}: {e}")
+    return df
+
 def analyze_communities(directory=None, file=None):
     """Analyze communities from the specified directory or file."""
-    communities_data = []
-    
-    if directory:
+    import numpy as np
+    import pandas as pd
+
+    path = directory or file
+    if path and path.lower().endswith('.parquet'):
+        # Columnar data written by dcil.py --format parquet needs no parsing
+        df = pd.read_parquet(path, engine='pyarrow')
+    elif directory:
         # Analyze all text files in the directory
-        for filename in os.listdir(directory):
-            if filename.endswith('.txt'):
-                filepath = os.path.join(directory, filename)
-                community_data = load_data_from_file(filepath)
-                communities_data.append(community_data)
+        df = load_data_from_directory(directory)
     elif file:
         # Analyze the single text file
-        community_data = load_data_from_file(file)
-        communities_data.append(community_data)
-    
-    df = pd.DataFrame(communities_data)
-    
+        df = load_data_from_files([file])
+    else:
+        df = load_data_from_files([])
+
+    # Member counts fit comfortably in int32; Parquet inputs may still arrive as int64
+    for column in ('active_members', 'offline_members', 'total_members'):
+        df[column] = df[column].astype(np.int32)
+
+    # Calculate additional metrics
+    active = df['active_members'].to_numpy()
+    offline = df['offline_members'].to_numpy()
+    total = df['total_members'].to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['engagement_rate'] = np.where(total > 0, active / total * 100, 0.0)
+        df['active_ratio'] = active / (offline + 1)  # Adding 1 to avoid division by zero
+
     # Add rankings
     df['size_rank'] = df['total_members'].rank(ascending=False)
     df['engagement_rank'] = df['engagement_rate'].rank(ascending=False)
@@ -106,10 +198,16 @@ def save_analysis_results(save_dir, is_single_community=False):
 
 def generate_analysis_report(df):
     """Generate a detailed competitive analysis report."""
-    # Sort communities by different metrics (all communities, not just top 5)
-    by_size = df.sort_values('total_members', ascending=False)[['community_name', 'total_members', 'engagement_rate']]
-    by_engagement = df.sort_values('engagement_rate', ascending=False)[['community_name', 'engagement_rate', 'total_members']]
-    by_activity = df.sort_values('active_ratio', ascending=False)[['community_name', 'active_members', 'total_members']]
+    import numpy as np
+
+    # Sort communities by different metrics (all communities, not just top 5).
+    # Take just the needed columns first and reorder them by a descending argsort.
+    by_size = df[['community_name', 'total_members', 'engagement_rate']]
+    by_size = by_size.iloc[np.argsort(-df['total_members'].to_numpy(), kind='stable')]
+    by_engagement = df[['community_name', 'engagement_rate', 'total_members']]
+    by_engagement = by_engagement.iloc[np.argsort(-df['engagement_rate'].to_numpy(), kind='stable')]
+    by_activity = df[['community_name', 'active_members', 'total_members']]
+    by_activity = by_activity.iloc[np.argsort(-df['active_ratio'].to_numpy(), kind='stable')]
 
     report = ["=== Discord Communities Competitive Analysis Report ===\n"]
     
@@ -152,12 +250,28 @@ def generate_analysis_report(df):
     
     print("Competitive analysis report saved as 'analysis_report.txt'")
 
+def load_pyplot():
+    """Import pyplot on the non-interactive Agg backend with file-friendly defaults."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.rcParams['figure.dpi'] = 100
+    plt.rcParams['savefig.dpi'] = 100
+    return plt
+
 def generate_single_community_visualizations(df):
     """Generate visualizations specifically for single community analysis."""
-    community_data = df.iloc[0]  # Get the first (and only) community's data
+    plt = load_pyplot()
+
+    # Get the first (and only) community's data as a plain dict to avoid pandas indexing per field
+    community_data = df.iloc[0].to_dict()
     
+    # Both charts are drawn on one reused figure, cleared between plots
+    fig = plt.figure(figsize=(10, 6))
+
     # 1. Active vs Inactive Members Comparison
-    plt.figure(figsize=(10, 6))
+    fig.add_subplot(111)
     members_data = [community_data['active_members'], community_data['offline_members']]
     labels = ['Active Members', 'Inactive Members']
     colors = ['#2ecc71', '#e74c3c']
@@ -167,11 +281,12 @@ def generate_single_community_visualizations(df):
     plt.title(f'Member Activity Distribution in {community_data["community_name"]}\n'
              f'Total Members: {community_data["total_members"]:,}')
     plt.axis('equal')
-    plt.savefig('active_vs_inactive_distribution.png')
+    plt.savefig('active_vs_inactive_distribution.png', bbox_inches=None)
     print("Saved member distribution visualization as 'active_vs_inactive_distribution.png'")
 
     # 2. Bar chart comparing active vs inactive with total
-    plt.figure(figsize=(10, 6))
+    fig.clear()
+    fig.add_subplot(111)
     categories = ['Active Members', 'Inactive Members', 'Total Members']
     values = [community_data['active_members'], 
              community_data['offline_members'],
@@ -188,8 +303,9 @@ def generate_single_community_visualizations(df):
                 f'{int(height):,}',
                 ha='center', va='bottom')
     
-    plt.tight_layout()
-    plt.savefig('membership_breakdown.png')
+    plt.subplots_adjust(**FIGURE_MARGINS)
+    plt.savefig('membership_breakdown.png', bbox_inches=None)
+    plt.close(fig)
     print("Saved membership breakdown visualization as 'membership_breakdown.png'")
 
     # 3. Calculate and display activity ratios
@@ -220,55 +336,78 @@ def generate_single_community_visualizations(df):
         file.write('\n'.join(ratio_report))
     print("Saved activity ratio report as 'activity_ratio_report.txt'")
 
+def annotate_points(ax, xs, ys, names):
+    """Label scatter points, keeping at most one label per grid cell when there are many points."""
+    import numpy as np
+
+    if len(names) > MAX_POINT_LABELS:
+        # Bucket points into a coarse grid over the data range and keep the first label per cell
+        def bucket(values):
+            span = np.ptp(values) or 1
+            return ((values - values.min()) / span * (LABEL_GRID_SIZE - 1)).astype(np.int64)
+        cells = bucket(xs) * LABEL_GRID_SIZE + bucket(ys)
+        _, keep = np.unique(cells, return_index=True)
+        xs, ys, names = xs[keep], ys[keep], names[keep]
+
+    for x, y, name in zip(xs, ys, names):
+        ax.text(x, y, name, fontsize=8, alpha=0.7)
+
 def generate_visualizations(df, is_single_community=False):
     """Generate business-focused visualizations."""
+    plt = load_pyplot()
+
     if is_single_community:
         generate_single_community_visualizations(df)
         return
         
     plt.style.use('ggplot')  # Using ggplot style instead of seaborn
     
+    # All charts are drawn on one reused figure, cleared between plots
+    fig = plt.figure(figsize=(12, 6))
+
     # Engagement Rate vs Community Size
-    plt.figure(figsize=(12, 6))
-    plt.scatter(df['total_members'], df['engagement_rate'], alpha=0.6)
-    for i, txt in enumerate(df['community_name']):
-        plt.annotate(txt, (df['total_members'].iloc[i], df['engagement_rate'].iloc[i]), 
-                    fontsize=8, alpha=0.7)
+    fig.add_subplot(111)
+    names = df['community_name'].to_numpy()
+    members = df['total_members'].to_numpy()
+    engagement = df['engagement_rate'].to_numpy()
+    plt.scatter(members, engagement, alpha=0.6, rasterized=True)
+    annotate_points(plt.gca(), members, engagement, names)
     plt.title('Engagement Rate vs Community Size')
     plt.xlabel('Total Members (Community Size)')
     plt.ylabel('Engagement Rate (%)')
-    plt.tight_layout()
-    plt.savefig('engagement_analysis.png')
+    plt.subplots_adjust(**FIGURE_MARGINS)
+    plt.savefig('engagement_analysis.png', bbox_inches=None)
     print("Saved engagement analysis visualization as 'engagement_analysis.png'")
 
     # Top 10 Communities by Engagement
-    plt.figure(figsize=(12, 6))
+    fig.clear()
+    fig.add_subplot(111)
     top10 = df.nlargest(10, 'engagement_rate')
-    bars = plt.bar(top10['community_name'], top10['engagement_rate'])
+    top10_rates = top10['engagement_rate'].to_numpy()
+    bars = plt.bar(top10['community_name'].to_numpy(), top10_rates)
     plt.title('Top 10 Communities by Engagement Rate')
     plt.xlabel('Community Name')
     plt.ylabel('Engagement Rate (%)')
     plt.xticks(rotation=45, ha='right')
-    for bar in bars:
-        height = bar.get_height()
+    for bar, height in zip(bars, top10_rates):
         plt.text(bar.get_x() + bar.get_width()/2., height,
                 f'{height:.1f}%', ha='center', va='bottom')
     plt.tight_layout()
-    plt.savefig('top_communities.png')
+    plt.savefig('top_communities.png', bbox_inches=None)
     print("Saved top communities visualization as 'top_communities.png'")
 
     # Activity Matrix
-    plt.figure(figsize=(12, 6))
-    plt.scatter(df['active_ratio'], df['engagement_rate'], 
-                s=df['total_members']/100, alpha=0.6)
+    fig.clear()
+    fig.add_subplot(111)
+    active_ratio = df['active_ratio'].to_numpy()
+    plt.scatter(active_ratio, engagement, s=members/100, alpha=0.6, rasterized=True)
     plt.title('Community Activity Matrix')
     plt.xlabel('Active/Inactive Ratio')
     plt.ylabel('Engagement Rate (%)')
-    for i, txt in enumerate(df['community_name']):
-        plt.annotate(txt, (df['active_ratio'].iloc[i], df['engagement_rate'].iloc[i]), 
-                    fontsize=8, alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('activity_matrix.png')
+    annotate_points(plt.gca(), active_ratio, engagement, names)
+    plt.subplots_adjust(**FIGURE_MARGINS)
+    plt.savefig('activity_matrix.png', bbox_inches=None)
+    plt.close(fig)
     print("Saved activity matrix visualization as 'activity_matrix.png'")
 
 def main():
@@ -286,12 +425,14 @@ def main():
     # Analyze communities based on user input (directory or file)
     df = analyze_communities(directory=args.d, file=args.f)
 
+    # A text file holds one community, but a Parquet file may hold many
+    is_single_community = bool(args.f) and len(df) == 1
+
     # Generate analysis report
-    if not args.f:  # Only generate the competitive analysis report for multiple communities
+    if not is_single_community:  # Only generate the competitive analysis report for multiple communities
         generate_analysis_report(df)
 
     # Generate visualizations (single community or bulk)
-    is_single_community = bool(args.f)
     generate_visualizations(df, is_single_community=is_single_community)
 
     # Save results if -s flag is used
@@ -1,11 +1,49 @@
 #!/usr/bin/env python3
 import argparse
+import httpx
 import re
-import requests
+import sqlite3
+import threading
 import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 import os
 
+# orjson is considerably faster at decoding API responses; fall back to the stdlib if it's missing
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
+
+MAX_WORKERS = 16
+MAX_IO_WORKERS = 4
+# Scrapes submitted ahead of the workers; bounds memory for long -L files
+MAX_IN_FLIGHT = 2 * MAX_WORKERS
+
+# Default API requests per second, and how often a rate-limited (429) request is retried
+DEFAULT_RATE = 1
+MAX_RETRIES = 5
+
+# SQLite file used to cache API responses when --cache-ttl is given
+CACHE_FILE = 'dcil_cache.sqlite3'
+
+# Characters that are not allowed in filenames (including control characters), mapped to '_'
+INVALID_FILENAME_CHARS = str.maketrans({char: '_' for char in '<>:"/\\|?*' + ''.join(map(chr, range(32)))})
+
+INVITE_PATTERN = re.compile(r'(?:discord\.gg/|discord\.com/invite/)([\w-]+)')
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Shared HTTP/2 client: concurrent requests from the worker threads are
+# multiplexed over a single kept-alive connection to Discord's API
+SESSION = httpx.Client(http2=True, headers=HEADERS, timeout=10,
+                       limits=httpx.Limits(max_connections=MAX_WORKERS))
+
 def usage():
     return ("""Discord Community Information Lookup (DCIL)
 
@@ -24,33 +62,137 @@ Required:
 
 Optional:
   -s <filename>        Save output to a single file (will add .txt if not specified)
+  --format <fmt>       Format of the -s file: 'txt' (default) or 'parquet'
+                      Parquet files can be passed directly to analyze_communities.py
   -S <base_filename>   Save each community to a separate file (only with -L)
                       Files will be named as <base_filename>_<server_name>.txt
   -d <directory>       Directory to save individual files (only with -L and -S)
+  --rate <n>           Maximum API requests per second (default: 1)
+  --cache-ttl <secs>   Reuse API responses cached on disk for up to <secs> seconds
   -u                   Display this usage information
 """)
 
-def scrape_discord_community(link):
+class RateLimiter:
+    """Allow at most `rate` calls per `period` seconds across all threads."""
+
+    def __init__(self, rate, period=1.0):
+        self.rate = rate
+        self.period = period
+        self.calls = deque()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Hold back every caller for `seconds`, e.g. after the API answers 429."""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    delay = self.resume_at - now
+                else:
+                    while self.calls and now - self.calls[0] >= self.period:
+                        self.calls.popleft()
+                    if len(self.calls) < self.rate:
+                        self.calls.append(now)
+                        return
+                    delay = self.period - (now - self.calls[0])
+            time.sleep(delay)
+
+# Be nice to Discord's API: cap the request rate (adjustable with --rate) instead of sleeping between calls
+RATE_LIMITER = RateLimiter(rate=DEFAULT_RATE, period=1.0)
+
+def retry_after(response):
+    """Seconds Discord asks us to wait after a 429, from the Retry-After header or the JSON body."""
+    try:
+        return float(response.headers['Retry-After'])
+    except (KeyError, ValueError):
+        pass
+    try:
+        return float(json_loads(response.content)['retry_after'])
+    except Exception:
+        return 1.0
+
+class InviteCache:
+    """On-disk cache of raw invite API responses, keyed by invite code."""
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self.memory = {}
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS invites '
+                              '(invite_code TEXT PRIMARY KEY, fetched_at REAL, payload BLOB)')
+
+    def fetch(self, invite_code, download):
+        """Return the payload for invite_code, calling download() at most once per run.
+
+        Concurrent lookups of the same code wait for the first one instead of hitting the API again.
+        """
+        with self.lock:
+            future = self.memory.get(invite_code)
+            is_owner = future is None
+            if is_owner:
+                future = self.memory[invite_code] = Future()
+        if not is_owner:
+            return future.result()
+
+        try:
+            payload = self.load(invite_code)
+            if payload is None:
+                payload = download()
+                self.store(invite_code, payload)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(payload)
+        return payload
+
+    def load(self, invite_code):
+        """Return the cached payload for invite_code, or None if missing or older than the TTL."""
+        with self.lock:
+            row = self.conn.execute('SELECT fetched_at, payload FROM invites WHERE invite_code = ?',
+                                    (invite_code,)).fetchone()
+        if row and time.time() - row[0] < self.ttl:
+            return row[1]
+        return None
+
+    def store(self, invite_code, payload):
+        with self.lock:
+            with self.conn:
+                self.conn.execute('INSERT OR REPLACE INTO invites VALUES (?, ?, ?)',
+                                  (invite_code, time.time(), payload))
+
+def scrape_discord_community(link, session=SESSION, cache=None):
     try:
         # Extract invite code from the provided discord link
-        pattern = r'(?:discord\.gg/|discord\.com/invite/)([\w-]+)'
-        match = re.search(pattern, link)
+        match = INVITE_PATTERN.search(link)
         if not match:
             raise ValueError("Invalid Discord invite link format")
         
         invite_code = match.group(1)
         
-        # Use Discord's public invite API
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        url = f"https://discord.com/api/v9/invites/{invite_code}?with_counts=true"
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code != 200:
-            raise Exception(f"Failed to fetch data (Status code: {response.status_code})")
-        
-        data = response.json()
+        def download():
+            # Use Discord's public invite API
+            url = f"https://discord.com/api/v9/invites/{invite_code}?with_counts=true"
+
+            for attempt in range(MAX_RETRIES + 1):
+                RATE_LIMITER.wait()
+                response = session.get(url)
+                if response.status_code == 429 and attempt < MAX_RETRIES:
+                    # Rate limited: make every worker back off, then try this link again
+                    RATE_LIMITER.pause(retry_after(response))
+                    continue
+                if response.status_code != 200:
+                    raise Exception(f"Failed to fetch data (Status code: {response.status_code})")
+                return response.content
+
+        payload = cache.fetch(invite_code, download) if cache else download()
+        data = json_loads(payload)
         
         total_members = data['approximate_member_count']
         active_members = data['approximate_presence_count']
@@ -66,6 +208,14 @@ def scrape_discord_community(link):
     except Exception as e:
         raise Exception(f"Error scraping community: {str(e)}")
 
+def iter_links(filepath):
+    # Yield non-empty links one at a time so requests start before the whole file is read
+    with open(filepath, 'r') as f:
+        for line in f:
+            link = line.strip()
+            if link:
+                yield link
+
 def format_report(info):
     report = []
     report.append(f"Community Name: {info['community_name']}")
@@ -81,16 +231,38 @@ def ensure_directory_exists(directory):
 
 def sanitize_filename(filename):
     # Remove or replace invalid filename characters
-    invalid_chars = '<>:"/\\|?*'
-    for char in invalid_chars:
-        filename = filename.replace(char, '_')
-    return filename
+    return filename.translate(INVALID_FILENAME_CHARS)
 
 def ensure_txt_extension(filename):
     if not filename.lower().endswith('.txt'):
         return filename + '.txt'
     return filename
 
+def ensure_parquet_extension(filename):
+    if not filename.lower().endswith('.parquet'):
+        return filename + '.parquet'
+    return filename
+
+def save_parquet(infos, filename):
+    import pandas as pd
+
+    columns = ['community_name', 'link', 'active_members', 'offline_members', 'total_members']
+    df = pd.DataFrame(infos, columns=columns)
+    # Member counts fit comfortably in int32
+    df = df.astype({'active_members': 'int32', 'offline_members': 'int32', 'total_members': 'int32'})
+    df.to_parquet(filename, engine='pyarrow', compression='zstd', index=False)
+
+def write_report(filepath, report, community_name, previous_write=None):
+    # Let an earlier write to the same path finish first so the two never interleave
+    if previous_write is not None:
+        wait([previous_write])
+    try:
+        with open(filepath, 'w') as f:
+            f.write(report)
+        print(f"Saved report for {community_name} to {filepath}")
+    except Exception as e:
+        print(f"Error writing to file {filepath}: {e}")
+
 def main():
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument('-l', type=str, help='Discord community invite link')
@@ -98,6 +270,9 @@ def main():
     parser.add_argument('-s', type=str, help='Output file name to save the results')
     parser.add_argument('-S', type=str, help='Base filename for individual community files')
     parser.add_argument('-d', type=str, help='Directory to save individual files')
+    parser.add_argument('--format', choices=['txt', 'parquet'], default='txt', help='Format of the -s output file')
+    parser.add_argument('--rate', type=int, default=DEFAULT_RATE, help='Maximum API requests per second')
+    parser.add_argument('--cache-ttl', type=float, help='Seconds to reuse cached API responses')
     parser.add_argument('-u', action='store_true', help='Display usage information')
     args = parser.parse_args()
 
@@ -117,61 +292,114 @@ def main():
             return
         ensure_directory_exists(args.d)
 
+    if args.format == 'parquet' and not args.s:
+        print("Error: --format parquet can only be used with -s flag")
+        return
+
+    if args.rate < 1:
+        print("Error: --rate must be at least 1")
+        return
+    RATE_LIMITER.rate = args.rate
+
+    cache = InviteCache(CACHE_FILE, args.cache_ttl) if args.cache_ttl else None
+
     reports = []
+    infos = []
 
     if args.l:
         try:
-            info = scrape_discord_community(args.l)
+            info = scrape_discord_community(args.l, SESSION, cache)
+            infos.append(info)
             reports.append(format_report(info))
         except Exception as e:
             print(f"Error: {e}")
             return
 
     if args.L:
-        try:
-            with open(args.L, 'r') as f:
-                links = [line.strip() for line in f if line.strip()]
-            
-            for link in links:
-                try:
-                    info = scrape_discord_community(link)
-                    report = format_report(info)
-                    
-                    # If -S flag is used, save individual files
-                    if args.S:
-                        filename = f"{args.S}_{sanitize_filename(info['community_name'])}"
-                        filename = ensure_txt_extension(filename)
-                        
-                        if args.d:
-                            filepath = os.path.join(args.d, filename)
-                        else:
-                            filepath = filename
-                            
-                        try:
-                            with open(filepath, 'w') as f:
-                                f.write(report)
-                            print(f"Saved report for {info['community_name']} to {filepath}")
-                        except Exception as e:
-                            print(f"Error writing to file {filepath}: {e}")
-                    
-                    reports.append(report)
-                    # Add a small delay between requests to be nice to Discord's API
-                    time.sleep(1)
-                except Exception as e:
-                    error_msg = f"Error scraping {link}: {str(e)}"
-                    reports.append(error_msg)
-                    print(error_msg)
-        except Exception as e:
-            print(f"Error reading file: {e}")
-            return
+        results = {}
+        scraped = {}
+        numbered_links = enumerate(iter_links(args.L))
+        links_left = True
+        read_error = None
+        pending = {}
+        writes = {}
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor, \
+                ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as io_pool:
+            while True:
+                # Keep a bounded number of scrapes in flight, reading more links as earlier ones finish
+                while links_left and len(pending) < MAX_IN_FLIGHT:
+                    try:
+                        i, link = next(numbered_links)
+                    except StopIteration:
+                        links_left = False
+                        break
+                    except Exception as e:
+                        read_error = e
+                        links_left = False
+                        break
+                    pending[executor.submit(scrape_discord_community, link, SESSION, cache)] = (i, link)
+
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i, link = pending.pop(future)
+                    try:
+                        info = future.result()
+                        report = format_report(info)
+
+                        # If -S flag is used, save individual files
+                        if args.S:
+                            filename = f"{args.S}_{sanitize_filename(info['community_name'])}"
+                            filename = ensure_txt_extension(filename)
+
+                            if args.d:
+                                filepath = os.path.join(args.d, filename)
+                            else:
+                                filepath = filename
+
+                            # Write in the background so disk I/O overlaps with the remaining requests.
+                            # Writes to one path are chained, and the link later in the input file wins,
+                            # as it did when files were written sequentially.
+                            last_index, last_write = writes.get(filepath, (-1, None))
+                            if i > last_index:
+                                writes[filepath] = (i, io_pool.submit(write_report, filepath, report,
+                                                                      info['community_name'], last_write))
+
+                        results[i] = report
+                        scraped[i] = info
+                    except Exception as e:
+                        error_msg = f"Error scraping {link}: {str(e)}"
+                        results[i] = error_msg
+                        print(error_msg)
+
+        if read_error is not None:
+            print(f"Error reading file: {read_error}")
+            if not results:
+                return
+
+        # Keep the combined report in the same order as the input file
+        reports.extend(results[i] for i in range(len(results)))
+        infos.extend(scraped[i] for i in sorted(scraped))
 
     # If -s is used, save combined report
-    if args.s:
-        final_report = "\n\n".join(reports)
+    if args.s and args.format == 'parquet':
+        output_file = ensure_parquet_extension(args.s)
+        try:
+            save_parquet(infos, output_file)
+            print(f"Combined data for {len(infos)} communities saved to {output_file}")
+        except Exception as e:
+            print(f"Error writing to file: {e}")
+    elif args.s:
         output_file = ensure_txt_extension(args.s)
         try:
+            # Stream each report straight to the file rather than joining them all in memory first
             with open(output_file, 'w') as f:
-                f.write(final_report)
+                for i, report in enumerate(reports):
+                    if i:
+                        f.write("\n\n")
+                    f.write(report)
             print(f"Combined report saved to {output_file}")
         except Exception as e:
             print(f"Error writing to file: {e}")